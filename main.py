@@ -1,12 +1,23 @@
 import asyncio
 import aiohttp
-import json
+import numpy as np
+import orjson
 import random
+import heapq
 import time
 import logging
+import logging.handlers
+import queue
+import atexit
 from collections import defaultdict
+from dataclasses import dataclass
 import os
 
+try:
+    import uvloop
+except ImportError:
+    uvloop = None
+
 
 FALLBACK_PRICE = int(os.getenv("FALLBACK_PRICE", 32000))
 TICKSIZE = int(os.getenv("TICKSIZE", 10))
@@ -17,6 +28,8 @@ ORDER_API_BASE = os.getenv("ORDER_API_BASE", "http://localhost:8000/api/v1/marke
 SPREAD_FILLER_THRESHOLD = int(os.getenv("SPREAD_FILLER_THRESHOLD", 10))
 ONEWAY_PROB = float(os.getenv("ONEWAY_PROB", 0.008))
 CANCEL_TOP_PROB = float(os.getenv("CANCEL_TOP_PROB", 0.05))
+CANCEL_MAX_ATTEMPTS = int(os.getenv("CANCEL_MAX_ATTEMPTS", 5))
+STALE_TICK_LIMIT = int(os.getenv("STALE_TICK_LIMIT", 3))
 ONEWAY_DURATION_MIN = int(os.getenv("ONEWAY_DURATION_MIN", 20))
 ONEWAY_DURATION_MAX = int(os.getenv("ONEWAY_DURATION_MAX", 120))
 MIN_PRICE = int(os.getenv("MIN_PRICE", 10))
@@ -27,91 +40,159 @@ GAP_PROBABILITY = float(os.getenv("GAP_PROBABILITY", 0.3))
 GAP_MIN_TICKS = int(os.getenv("GAP_MIN_TICKS", -500))
 GAP_MAX_TICKS = int(os.getenv("GAP_MAX_TICKS", 1000))
 
+BULK_ORDERS = os.getenv("BULK_ORDERS", "true").lower() == "true"
+BULK_MAX_FAILURES = int(os.getenv("BULK_MAX_FAILURES", 5))
+ORDER_DELETE_DELAY = int(os.getenv("ORDER_DELETE_DELAY", 600))
+ORDER_TIMEOUT = aiohttp.ClientTimeout(total=float(os.getenv("ORDER_TIMEOUT", 5.0)))
+
 PRICE_SAVE_FILE = os.getenv("PRICE_SAVE_FILE", "last_price.json")
 LOG_FILE_PATH = os.getenv("LOG_FILE_PATH", "trading_bot.log")
 HEADERS = {"X-Forwarded-For": "127.0.0.1"}
-
+JSON_HEADERS = {"Content-Type": "application/json"}
+SIDES = ("buy", "sell")
+ORDER_URLS = {side: f"{ORDER_API_BASE}/{SYMBOL}/{side}" for side in SIDES}
+BULK_ORDER_URLS = {side: f"{ORDER_API_BASE}/{SYMBOL}/{side}/bulk" for side in SIDES}
+
+STR_MULT_UP = {"strong": 2.4, "medium": 1.8, "weak": 1.5, "none": 1.0}
+STR_MULT_DOWN = {"strong": 2.4, "medium": 1.5, "weak": 1.1, "none": 1.0}
+STR_MULT_FILLER = {"strong": 2.4, "medium": 1.5, "weak": 1.1, "none": 1.0}
+TRADING_INTERVALS = {"low": (0.6, 0.8), "normal": (0.4, 0.6), "high": (0.25, 0.4)}
+TREND_NAMES = {"slight_up": "횡보:약상승", "slight_down": "횡보:약하락", "neutral": "횡보:중립"}
+LIQUIDITY_CUTS = (0.6, 0.85)
+STRENGTH_CUTS = (0.5, 0.8)
+TREND_CUTS = (UPWARD_BIAS / 1.2, 1.0 / 1.2)
+
+log_handlers = [
+    logging.FileHandler(LOG_FILE_PATH),
+    logging.StreamHandler()
+]
+for log_handler in log_handlers:
+    log_handler.setFormatter(logging.Formatter('%(asctime)s - %(message)s'))
+
+log_queue = queue.SimpleQueue()
+log_listener = logging.handlers.QueueListener(log_queue, *log_handlers)
+log_listener.start()
+atexit.register(log_listener.stop)
+
+
+class LazyQueueHandler(logging.handlers.QueueHandler):
+    def prepare(self, record):
+        return record
+
+
+queue_handler = LazyQueueHandler(log_queue)
 logging.basicConfig(
     level=logging.INFO,
-    format='%(asctime)s - %(message)s',
-    handlers=[
-        logging.FileHandler(LOG_FILE_PATH),
-        logging.StreamHandler()
-    ]
+    handlers=[queue_handler]
 )
 
 
+@dataclass(slots=True)
+class Order:
+    side: str
+    type: str
+    quantity: int
+    price: int | None = None
+    persistent: bool = False
+    log: str | None = None
+
+
 def aggregate_orders(orders):
     
-    market_orders = defaultdict(lambda: {"quantity": 0, "log": None, "persistent": False})
-    limit_orders = defaultdict(lambda: {"quantity": 0, "log": None, "persistent": False})
-    
+    agg = {}
+    agg_get = agg.get
     for order in orders:
-        side = order["side"]
-        order_type = order["type"]
-        quantity = order["quantity"]
-        log_flag = order.get("log")
-        persistent = order.get("persistent", False)  
-        
-        if order_type == "market":
-            
-            key = side
-            market_orders[key]["quantity"] += quantity
-            if log_flag:
-                market_orders[key]["log"] = log_flag
-            if persistent:
-                market_orders[key]["persistent"] = True
+        key = (order.type, order.side, order.price)
+        slot = agg_get(key)
+        if slot is None:
+            agg[key] = [order.quantity, order.log, order.persistent]
         else:
-            
-            price = order["price"]
-            key = (side, price)
-            limit_orders[key]["quantity"] += quantity
-            if log_flag:
-                limit_orders[key]["log"] = log_flag
-            if persistent:
-                limit_orders[key]["persistent"] = True
-    
-    
-    aggregated = []
-    
+            slot[0] += order.quantity
+            if order.log:
+                slot[1] = order.log
+            if order.persistent:
+                slot[2] = True
     
-    for side, data in market_orders.items():
-        aggregated.append({
-            "side": side,
-            "type": "market",
-            "quantity": data["quantity"],
-            "log": data["log"],
-            "persistent": data["persistent"]
-        })
-    
-    
-    for (side, price), data in limit_orders.items():
-        aggregated.append({
-            "side": side,
-            "type": "limit",
-            "price": price,
-            "quantity": data["quantity"],
-            "log": data["log"],
-            "persistent": data["persistent"]
-        })
+    if len(agg) == len(orders):
+        return orders
     
-    return aggregated
+    return [
+        Order(side=side, type=order_type, quantity=quantity, price=price, persistent=persistent, log=log)
+        for (order_type, side, price), (quantity, log, persistent) in agg.items()
+    ]
+
+
+def aggregate_ladder(prices, qtys):
+    unique_prices, inverse = np.unique(prices, return_inverse=True)
+    summed_qtys = np.bincount(inverse, weights=qtys).astype(np.int64)
+    return unique_prices, summed_qtys
+
+
+def _pick2(rv, p0, a, b):
+    return a if rv < p0 else b
+
+
+def _pick3(rv, p0, p01, a, b, c):
+    return a if rv < p0 else (b if rv < p01 else c)
 
 
 class UltraFastMarketBot:
+    __slots__ = (
+        "depth_data",
+        "top_bid",
+        "top_ask",
+        "best_bid",
+        "best_ask",
+        "ledger_data",
+        "session_data",
+        "last_trade_price",
+        "fallback_price",
+        "ticksize",
+        "_ts_half",
+        "whale_ratio",
+        "market_mode",
+        "market_mode_until",
+        "oneway_strength",
+        "min_price",
+        "_min_tick",
+        "liquidity_level",
+        "_rng",
+        "prev_market_mode",
+        "prev_oneway_strength",
+        "prev_market_trend",
+        "market_opened_at",
+        "last_close_price",
+        "market_open_event",
+        "depth_ready",
+        "_price_save_queue",
+        "_last_saved_prices",
+        "state_seq",
+        "order_delete_heap",
+        "order_delete_event",
+        "bulk_available",
+        "bulk_failures"
+    )
+
     def __init__(self, fallback_price, ticksize, whale_ratio=0.25):
         self.depth_data = None
+        self.top_bid = None
+        self.top_ask = None
+        self.best_bid = None
+        self.best_ask = None
         self.ledger_data = None
         self.session_data = None
         self.last_trade_price = None
         self.fallback_price = fallback_price
         self.ticksize = ticksize
+        self._ts_half = ticksize // 2
         self.whale_ratio = whale_ratio
         self.market_mode = "neutral"
         self.market_mode_until = 0
         self.oneway_strength = "none"
         self.min_price = MIN_PRICE
+        self._min_tick = self.nearest_tick(MIN_PRICE)
         self.liquidity_level = "normal"
+        self._rng = np.random.default_rng()
         
         
         self.prev_market_mode = "neutral"
@@ -127,45 +208,78 @@ class UltraFastMarketBot:
 
         self.market_open_event = asyncio.Event()
         self.market_open_event.set()
+        self.depth_ready = asyncio.Event()
+
+        self._price_save_queue = asyncio.Queue(maxsize=1)
+        self._last_saved_prices = (self.last_trade_price, self.last_close_price)
+        self.state_seq = 0
+
+        self.order_delete_heap = []
+        self.order_delete_event = asyncio.Event()
+        self.bulk_available = BULK_ORDERS
+        self.bulk_failures = 0
         
     def save_last_price(self):
         
+        if (self.last_trade_price, self.last_close_price) == self._last_saved_prices:
+            return
+        data = {
+            "last_trade_price": self.last_trade_price,
+            "last_close_price": self.last_close_price,
+            "timestamp": time.time()
+        }
+        try:
+            self._price_save_queue.get_nowait()
+        except asyncio.QueueEmpty:
+            pass
+        self._price_save_queue.put_nowait(data)
+
+    def _write_last_price(self, data):
+        
         try:
-            data = {
-                "last_trade_price": self.last_trade_price,
-                "last_close_price": self.last_close_price,
-                "timestamp": time.time()
-            }
-            with open(PRICE_SAVE_FILE, 'w') as f:
-                json.dump(data, f)
+            tmp_path = PRICE_SAVE_FILE + ".tmp"
+            with open(tmp_path, 'wb') as f:
+                f.write(orjson.dumps(data))
+            os.replace(tmp_path, PRICE_SAVE_FILE)
+            self._last_saved_prices = (data["last_trade_price"], data["last_close_price"])
         except Exception as e:
-            logging.error(f"가격 저장 실패: {e}")
+            logging.error("가격 저장 실패: %s", e)
+
+    async def price_flusher(self):
+        while True:
+            data = await self._price_save_queue.get()
+            await asyncio.to_thread(self._write_last_price, data)
 
     def load_last_price(self):
         
         try:
-            with open(PRICE_SAVE_FILE, 'r') as f:
-                data = json.load(f)
+            with open(PRICE_SAVE_FILE, 'rb') as f:
+                data = orjson.loads(f.read())
                 self.last_trade_price = data.get("last_trade_price")
                 self.last_close_price = data.get("last_close_price")
                 timestamp = data.get("timestamp")
                 
                 if self.last_trade_price:
-                    logging.info(f"💾 저장된 가격 로드: {self.last_trade_price} (저장 시각: {time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(timestamp))})")
+                    logging.info("💾 저장된 가격 로드: %s (저장 시각: %s)", self.last_trade_price, time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(timestamp)))
                 if self.last_close_price:
-                    logging.info(f"💾 저장된 종가 로드: {self.last_close_price}")
+                    logging.info("💾 저장된 종가 로드: %s", self.last_close_price)
         except FileNotFoundError:
             logging.info("💾 저장된 가격 파일이 없습니다. 기본값 사용")
         except Exception as e:
-            logging.error(f"가격 로드 실패: {e}")
+            logging.error("가격 로드 실패: %s", e)
 
     def protect_min_price(self, price):
-        return max(price, self.min_price)
+        return price if price > self.min_price else self.min_price
 
     def nearest_tick(self, price):
-        protected_price = max(price, self.min_price)
+        p = price if price > self.min_price else self.min_price
         ts = self.ticksize
-        return int(round(protected_price / ts) * ts)
+        return int((p + self._ts_half) // ts * ts)
+
+    def _nearest_tick_arr(self, prices):
+        p = np.maximum(prices, self.min_price)
+        ts = self.ticksize
+        return ((p + self._ts_half) // ts * ts).astype(np.int64)
 
     def get_reference_price(self):
         ltp = self.last_trade_price
@@ -175,11 +289,13 @@ class UltraFastMarketBot:
         print("FallBack: " + str(self.fallback_price))
         return self.nearest_tick(self.fallback_price)
 
-    def is_warmup_period(self):
+    def is_warmup_period(self, now=None):
         
         if self.market_opened_at is None:
             return False
-        return (time.time() - self.market_opened_at) < MARKET_WARMUP_SECONDS
+        if now is None:
+            now = time.monotonic()
+        return (now - self.market_opened_at) < MARKET_WARMUP_SECONDS
 
     def set_liquidity_level(self):
         strength = self.oneway_strength
@@ -190,42 +306,42 @@ class UltraFastMarketBot:
         elif strength == "weak":
             self.liquidity_level = "low"
         else:
-            self.liquidity_level = random.choices(["normal", "low", "high"], [0.6, 0.25, 0.15])[0]
+            self.liquidity_level = _pick3(random.random(), *LIQUIDITY_CUTS, "normal", "low", "high")
 
     def get_trading_interval(self):
         if self.is_warmup_period():
             return random.uniform(0.8, 1.2)
         
         
-        intervals = self._intervals if hasattr(self, '_intervals') else {
-            "low": (0.6, 0.8),
-            "normal": (0.4, 0.6),
-            "high": (0.25, 0.4)
-        }
-        self._intervals = intervals
-        return random.uniform(*intervals[self.liquidity_level])
+        return random.uniform(*TRADING_INTERVALS[self.liquidity_level])
 
     def whale_orders(self, ref_price):
-        direction = random.choice(["bullish", "bearish"])
+        direction = _pick2(random.random(), 0.5, "bullish", "bearish")
         size_base = random.randint(250, 500)
         mult = random.randint(2, 4)
         flag = "[WHALE]"
         orders = []
         
-        logging.info(f"🐋 고래 활동 감지: {direction.upper()} 방향, 기준수량={size_base}, 배수={mult}")
+        logging.info("🐋 고래 활동 감지: %s 방향, 기준수량=%s, 배수=%s", direction.upper(), size_base, mult)
         
         if direction == "bullish":
-            orders += [{"side": "buy", "type": "market", "quantity": size_base, "log": flag} for _ in range(mult)]
-            orders += [{"side": "buy", "type": "limit", "price": self.nearest_tick(ref_price + random.randint(5, 25) * (i + 1)), "quantity": random.randint(size_base // 2, size_base), "log": flag} for i in range(mult)]
-            orders += [{"side": "sell", "type": "limit", "price": self.nearest_tick(ref_price + random.randint(30, 80) * (i + 1)), "quantity": random.randint(size_base // 3, size_base), "log": flag} for i in range(mult)]
+            side, counter_side, sign = "buy", "sell", 1
         else:
-            orders += [{"side": "sell", "type": "market", "quantity": size_base, "log": flag} for _ in range(mult)]
-            orders += [{"side": "sell", "type": "limit", "price": self.nearest_tick(ref_price - random.randint(5, 25) * (i + 1)), "quantity": random.randint(size_base // 2, size_base), "log": flag} for i in range(mult)]
-            orders += [{"side": "buy", "type": "limit", "price": self.nearest_tick(ref_price - random.randint(30, 80) * (i + 1)), "quantity": random.randint(size_base // 3, size_base), "log": flag} for i in range(mult)]
+            side, counter_side, sign = "sell", "buy", -1
+
+        rng = self._rng
+        steps = np.arange(1, mult + 1)
+        near_prices = self._nearest_tick_arr(ref_price + sign * rng.integers(5, 26, size=mult) * steps)
+        near_qtys = rng.integers(size_base // 2, size_base + 1, size=mult)
+        far_prices = self._nearest_tick_arr(ref_price + sign * rng.integers(30, 81, size=mult) * steps)
+        far_qtys = rng.integers(size_base // 3, size_base + 1, size=mult)
+
+        orders.extend(Order(side=side, type="market", quantity=size_base, log=flag) for _ in range(mult))
+        orders.extend(Order(side=side, type="limit", price=px, quantity=qty, log=flag) for px, qty in zip(near_prices.tolist(), near_qtys.tolist()))
+        orders.extend(Order(side=counter_side, type="limit", price=px, quantity=qty, log=flag) for px, qty in zip(far_prices.tolist(), far_qtys.tolist()))
         return orders
 
-    def maybe_trigger_oneway(self):
-        now = time.time()
+    def maybe_trigger_oneway(self, now):
         
         
         if self.market_opened_at is not None:
@@ -234,7 +350,7 @@ class UltraFastMarketBot:
                 
                 if self.market_mode != "neutral":
                     remaining = int(MARKET_WARMUP_SECONDS - time_since_open)
-                    logging.info(f"📊 시장 상태 변경: NEUTRAL (호가 채우기 기간 - 남은 시간: {remaining}초)")
+                    logging.info("📊 시장 상태 변경: NEUTRAL (호가 채우기 기간 - 남은 시간: %s초)", remaining)
                 self.market_mode = "neutral"
                 self.oneway_strength = "none"
                 self.prev_market_mode = "neutral"
@@ -251,23 +367,20 @@ class UltraFastMarketBot:
                 else:
                     bias = UPWARD_BIAS
 
-                direction = random.choices(["oneway_up", "oneway_down"], [bias, 1 - bias])[0]
+                direction = _pick2(random.random(), bias, "oneway_up", "oneway_down")
                 self.market_mode = direction
                 self.market_mode_until = now + random.randint(ONEWAY_DURATION_MIN, ONEWAY_DURATION_MAX)
 
-                if direction == "oneway_up":
-                    self.oneway_strength = random.choices(["weak", "medium", "strong"], [0.5, 0.3, 0.2])[0]
-                else:
-                    self.oneway_strength = random.choices(["weak", "medium", "strong"], [0.5, 0.3, 0.2])[0]
+                self.oneway_strength = _pick3(random.random(), *STRENGTH_CUTS, "weak", "medium", "strong")
                 
                 duration = int(self.market_mode_until - now)
-                logging.info(f"📊 시장 상태 변경: {direction.upper()} (강도: {self.oneway_strength}, 지속: {duration}초)")
+                logging.info("📊 시장 상태 변경: %s (강도: %s, 지속: %s초)", direction.upper(), self.oneway_strength, duration)
                 
                 self.prev_market_mode = self.market_mode
                 self.prev_oneway_strength = self.oneway_strength
             else:
                 if self.market_mode != "neutral":
-                    logging.info(f"📊 시장 상태 변경: NEUTRAL (횡보 전환)")
+                    logging.info("📊 시장 상태 변경: NEUTRAL (횡보 전환)")
                 self.market_mode = "neutral"
                 self.oneway_strength = "none"
                 self.prev_market_mode = "neutral"
@@ -279,14 +392,13 @@ class UltraFastMarketBot:
     def is_oneway_down(self):
         return self.market_mode == "oneway_down"
 
-    def spread_filler_orders(self, best_bid, best_ask):
+    def spread_filler_orders(self, best_bid, best_ask, is_warmup):
         orders = []
         spread = best_ask - best_bid
-        str_mult = {"strong": 2.4, "medium": 1.5, "weak": 1.1, "none": 1.0}[self.oneway_strength]
+        str_mult = STR_MULT_FILLER[self.oneway_strength]
         
         
-        threshold = 5 if self.is_warmup_period() else SPREAD_FILLER_THRESHOLD
-        is_warmup = self.is_warmup_period()
+        threshold = 5 if is_warmup else SPREAD_FILLER_THRESHOLD
         
         if spread >= self.ticksize * threshold:
             n_orders = min(max(spread // self.ticksize - 1, 2), 14)
@@ -296,138 +408,144 @@ class UltraFastMarketBot:
                 n_orders = min(max(spread // self.ticksize - 1, 8), 30)
             
             px_list = [best_bid + i * self.ticksize for i in range(1, n_orders)]
+            n_px = len(px_list)
+            rng = self._rng
             
-            if self.is_oneway_up():
-                for px in px_list:
-                    qty = int(random.randint(750, 1500) * str_mult)
-                    orders.append({"side": "buy", "type": "limit", "price": px, "quantity": qty, "persistent": is_warmup})
-                    sell_px = px + random.randint(2, 8) * self.ticksize
-                    orders.append({"side": "sell", "type": "limit", "price": sell_px, "quantity": qty, "persistent": is_warmup})
-            elif self.is_oneway_down():
-                for px in px_list:
-                    qty = int(random.randint(750, 1500) * str_mult)
-                    orders.append({"side": "sell", "type": "limit", "price": px, "quantity": qty, "persistent": is_warmup})
-                    buy_px = px - random.randint(2, 8) * self.ticksize
-                    orders.append({"side": "buy", "type": "limit", "price": buy_px, "quantity": qty, "persistent": is_warmup})
+            if self.is_oneway_up() or self.is_oneway_down():
+                if self.is_oneway_up():
+                    side, counter_side, sign = "buy", "sell", 1
+                else:
+                    side, counter_side, sign = "sell", "buy", -1
+                qtys = (rng.integers(750, 1501, size=n_px) * str_mult).astype(np.int64).tolist()
+                offsets = (sign * rng.integers(2, 9, size=n_px) * self.ticksize).tolist()
+                for px, qty, offset in zip(px_list, qtys, offsets):
+                    orders.append(Order(side=side, type="limit", price=px, quantity=qty, persistent=is_warmup))
+                    orders.append(Order(side=counter_side, type="limit", price=px + offset, quantity=qty, persistent=is_warmup))
             else:
-                for px in px_list:
-                    
-                    base_qty = random.randint(750, 1500)
-                    if is_warmup:
-                        base_qty = random.randint(2400, 5000)  
-                    qty = int(base_qty * str_mult)
-                    side = random.choice(["buy", "sell"])
-                    orders.append({"side": side, "type": "limit", "price": px, "quantity": qty, "persistent": is_warmup})
+                
+                low, high = (2400, 5000) if is_warmup else (750, 1500)
+                qtys = (rng.integers(low, high + 1, size=n_px) * str_mult).astype(np.int64).tolist()
+                sides = rng.integers(0, 2, size=n_px).tolist()
+                orders += [Order(side=SIDES[s], type="limit", price=px, quantity=qty, persistent=is_warmup) for px, qty, s in zip(px_list, qtys, sides)]
         return orders
 
     def decide_orders(self):
-        self.maybe_trigger_oneway()
+        now = time.monotonic()
+        is_warmup = self.is_warmup_period(now)
+        self.maybe_trigger_oneway(now)
         self.set_liquidity_level()
         ref_price = self.get_reference_price()
+        ts = self.ticksize
+        mt = self._min_tick
         orders = []
         
         
-        if self.is_warmup_period():
+        if is_warmup:
             
+            rng = self._rng
             n_limit = random.randint(25, 40)
-            for _ in range(n_limit):
-                
-                buy_offset = random.randint(1, 60)
-                buy_price = self.nearest_tick(ref_price - buy_offset * self.ticksize)
-                buy_qty = random.randint(400, 800)  
-                orders.append({"side": "buy", "type": "limit", "price": buy_price, "quantity": buy_qty, "persistent": True})
-                
-                
-                sell_offset = random.randint(1, 60)
-                sell_price = self.nearest_tick(ref_price + sell_offset * self.ticksize)
-                sell_qty = random.randint(400, 800)  
-                orders.append({"side": "sell", "type": "limit", "price": sell_price, "quantity": sell_qty, "persistent": True})
+            
+            buy_prices = np.maximum(ref_price - rng.integers(1, 61, size=n_limit) * ts, mt)
+            buy_qtys = rng.integers(400, 801, size=n_limit)
+            buy_prices, buy_qtys = aggregate_ladder(buy_prices, buy_qtys)
+            orders += [Order(side="buy", type="limit", price=px, quantity=qty, persistent=True) for px, qty in zip(buy_prices.tolist(), buy_qtys.tolist())]
+            
+            sell_prices = np.maximum(ref_price + rng.integers(1, 61, size=n_limit) * ts, mt)
+            sell_qtys = rng.integers(400, 801, size=n_limit)
+            sell_prices, sell_qtys = aggregate_ladder(sell_prices, sell_qtys)
+            orders += [Order(side="sell", type="limit", price=px, quantity=qty, persistent=True) for px, qty in zip(sell_prices.tolist(), sell_qtys.tolist())]
             
             
             n_market = random.randint(3, 8)
-            for _ in range(n_market):
-                side = random.choice(["buy", "sell"])
-                market_qty = random.randint(50, 150)
-                orders.append({"side": side, "type": "market", "quantity": market_qty})
+            market_sides = rng.integers(0, 2, size=n_market).tolist()
+            market_qtys = rng.integers(50, 151, size=n_market).tolist()
+            orders += [Order(side=SIDES[s], type="market", quantity=qty) for s, qty in zip(market_sides, market_qtys)]
             
             
             n_small = random.randint(1, 3)
-            for _ in range(n_small):
-                side = random.choice(["buy", "sell"])
-                small_qty = random.randint(10, 50)
-                orders.append({"side": side, "type": "market", "quantity": small_qty})
+            small_sides = rng.integers(0, 2, size=n_small).tolist()
+            small_qtys = rng.integers(10, 51, size=n_small).tolist()
+            orders += [Order(side=SIDES[s], type="market", quantity=qty) for s, qty in zip(small_sides, small_qtys)]
             
             
-            if self.depth_data and self.depth_data.get("bids") and self.depth_data.get("asks"):
-                best_bid = self.depth_data["bids"][0][0]
-                best_ask = self.depth_data["asks"][0][0]
-                orders += self.spread_filler_orders(best_bid, best_ask)
+            if self.best_bid is not None and self.best_ask is not None:
+                orders += self.spread_filler_orders(self.best_bid, self.best_ask, is_warmup)
             
             
             return aggregate_orders(orders)
         
         
-        if self.is_oneway_up():
-            str_mult = {"strong": 2.4, "medium": 1.8, "weak": 1.5}[self.oneway_strength]
-            n = int(random.randint(2, 5) * str_mult)
-            orders += [{"side": "buy", "type": "limit", "price": self.nearest_tick(ref_price + int(str_mult * random.randint(10, 30)) * self.ticksize), "quantity": int(random.randint(7, 150) * str_mult)} for _ in range(n)]
-            orders += [{"side": "sell", "type": "limit", "price": self.nearest_tick(ref_price + int(str_mult * random.randint(12, 35)) * self.ticksize), "quantity": int(random.randint(1, 50) * str_mult)} for _ in range(n)]
-        elif self.is_oneway_down():
-            str_mult = {"strong": 2.4, "medium": 1.5, "weak": 1.1}[self.oneway_strength]
+        if self.is_oneway_up() or self.is_oneway_down():
+            if self.is_oneway_up():
+                str_mult = STR_MULT_UP[self.oneway_strength]
+                side, counter_side, sign = "buy", "sell", 1
+            else:
+                str_mult = STR_MULT_DOWN[self.oneway_strength]
+                side, counter_side, sign = "sell", "buy", -1
+            
+            rng = self._rng
             n = int(random.randint(2, 5) * str_mult)
-            orders += [{"side": "sell", "type": "limit", "price": self.nearest_tick(ref_price - int(str_mult * random.randint(10, 30)) * self.ticksize), "quantity": int(random.randint(7, 150) * str_mult)} for _ in range(n)]
-            orders += [{"side": "buy", "type": "limit", "price": self.nearest_tick(ref_price - int(str_mult * random.randint(12, 35)) * self.ticksize), "quantity": int(random.randint(1, 50) * str_mult)} for _ in range(n)]
+            near_offsets = (str_mult * rng.integers(10, 31, size=n)).astype(np.int64)
+            near_prices = np.maximum(ref_price + sign * near_offsets * ts, mt).tolist()
+            near_qtys = (rng.integers(7, 151, size=n) * str_mult).astype(np.int64).tolist()
+            far_offsets = (str_mult * rng.integers(12, 36, size=n)).astype(np.int64)
+            far_prices = np.maximum(ref_price + sign * far_offsets * ts, mt).tolist()
+            far_qtys = (rng.integers(1, 51, size=n) * str_mult).astype(np.int64).tolist()
+            orders += [Order(side=side, type="limit", price=px, quantity=qty) for px, qty in zip(near_prices, near_qtys)]
+            orders += [Order(side=counter_side, type="limit", price=px, quantity=qty) for px, qty in zip(far_prices, far_qtys)]
         else:
             is_whale_active = random.random() < self.whale_ratio
             if is_whale_active:
                 orders += self.whale_orders(ref_price)
             else:
-                market_trend = random.choices(
-                    ["slight_up", "slight_down", "neutral"],
-                    [UPWARD_BIAS, 1 - UPWARD_BIAS, 0.2]
-                )[0]
+                market_trend = _pick3(random.random(), *TREND_CUTS, "slight_up", "slight_down", "neutral")
                 
                 if market_trend != self.prev_market_trend:
-                    trend_name = {"slight_up": "횡보:약상승", "slight_down": "횡보:약하락", "neutral": "횡보:중립"}[market_trend]
-                    logging.info(f"📊 시장 상태 변경: {trend_name}")
+                    trend_name = TREND_NAMES[market_trend]
+                    logging.info("📊 시장 상태 변경: %s", trend_name)
                     self.prev_market_trend = market_trend
 
+                rng = self._rng
                 n = random.randint(2, 5)
-                for _ in range(n):
-                    price_up = self.nearest_tick(ref_price + random.randint(1, 6) * self.ticksize)
-                    price_dn = self.nearest_tick(ref_price - random.randint(1, 5) * self.ticksize)
-                    if market_trend == "slight_up":
-                        if random.random() < 0.6:
-                            orders.append({"side": "buy", "type": "limit", "price": price_up, "quantity": random.randint(1, 85)})
-                        orders.append({"side": "sell", "type": "limit", "price": price_dn, "quantity": random.randint(1, 85)})
-                    elif market_trend == "slight_down":
-                        if random.random() < 0.6:
-                            orders.append({"side": "sell", "type": "limit", "price": price_dn, "quantity": random.randint(1, 85)})
-                        if random.random() < 0.4:
-                            orders.append({"side": "buy", "type": "limit", "price": price_up, "quantity": random.randint(1, 85)})
-                    else:
-                        if random.random() < 0.6:
-                            orders.append({"side": "buy", "type": "limit", "price": price_up, "quantity": random.randint(1, 85)})
-                        orders.append({"side": "sell", "type": "limit", "price": price_dn, "quantity": random.randint(1, 85)})
-        
-        if self.depth_data and self.depth_data.get("bids") and self.depth_data.get("asks"):
-            best_bid = self.depth_data["bids"][0][0]
-            best_ask = self.depth_data["asks"][0][0]
-            orders += self.spread_filler_orders(best_bid, best_ask)
+                buy_prob, sell_prob = (0.4, 0.6) if market_trend == "slight_down" else (0.6, 1.0)
+                
+                prices_up = np.maximum(ref_price + rng.integers(1, 7, size=n) * ts, mt).tolist()
+                buy_qtys = rng.integers(1, 86, size=n).tolist()
+                buy_mask = (rng.random(n) < buy_prob).tolist()
+                orders += [Order(side="buy", type="limit", price=px, quantity=qty) for px, qty, keep in zip(prices_up, buy_qtys, buy_mask) if keep]
+                
+                prices_dn = np.maximum(ref_price - rng.integers(1, 6, size=n) * ts, mt).tolist()
+                sell_qtys = rng.integers(1, 86, size=n).tolist()
+                sell_mask = (rng.random(n) < sell_prob).tolist()
+                orders += [Order(side="sell", type="limit", price=px, quantity=qty) for px, qty, keep in zip(prices_dn, sell_qtys, sell_mask) if keep]
+        
+        if self.best_bid is not None and self.best_ask is not None:
+            orders += self.spread_filler_orders(self.best_bid, self.best_ask, is_warmup)
         
         
         return aggregate_orders(orders)
 
     def update_depth(self, depth):
-        self.depth_data = depth["depth"]
+        d = depth["depth"]
+        self.depth_data = d
+        bids = d.get("bids") if d else None
+        asks = d.get("asks") if d else None
+        self.top_bid = bids[0] if bids else None
+        self.top_ask = asks[0] if asks else None
+        self.best_bid = self.top_bid[0] if self.top_bid else None
+        self.best_ask = self.top_ask[0] if self.top_ask else None
+        self.state_seq += 1
+        self.depth_ready.set()
 
     def update_ledger(self, ledger):
         self.ledger_data = ledger
+        self.state_seq += 1
         if ledger and ledger.get("ledger"):
             self.last_trade_price = ledger["ledger"][0]["price"]
 
     def update_session(self, session):
         self.session_data = session.get("session")
+        self.state_seq += 1
 
         if self.session_data == "closed":
             if self.market_open_event.is_set():
@@ -436,10 +554,11 @@ class UltraFastMarketBot:
                     self.last_close_price = self.last_trade_price
                     
                     self.save_last_price()
-                    logging.info(f"🔴 시장 종료: 거래 중단 (종가: {self.last_close_price}) - 가격 저장됨")
+                    logging.info("🔴 시장 종료: 거래 중단 (종가: %s) - 가격 저장됨", self.last_close_price)
                 else:
                     logging.info("🔴 시장 종료: 거래 중단")
                 self.market_open_event.clear()
+                self.depth_ready.clear()
                 self.market_opened_at = None
         else:
             if not self.market_open_event.is_set():
@@ -463,13 +582,13 @@ class UltraFastMarketBot:
                     
                     self.save_last_price()
                     
-                    logging.info(f"🟢 시장 개장: 가격 갭 발생! {self.last_close_price} → {new_price} ({gap_direction} {abs(gap_amount)}, {gap_percent:.2f}%)")
-                    logging.info(f"   호가 채우기 기간 시작 ({MARKET_WARMUP_SECONDS}초)")
+                    logging.info("🟢 시장 개장: 가격 갭 발생! %s → %s (%s %s, %.2f%%)", self.last_close_price, new_price, gap_direction, abs(gap_amount), gap_percent)
+                    logging.info("   호가 채우기 기간 시작 (%s초)", MARKET_WARMUP_SECONDS)
                 else:
                     
-                    logging.info(f"🟢 시장 개장: 거래 재개 (상태: {self.session_data}) - 호가 채우기 기간 시작 ({MARKET_WARMUP_SECONDS}초)")
+                    logging.info("🟢 시장 개장: 거래 재개 (상태: %s) - 호가 채우기 기간 시작 (%s초)", self.session_data, MARKET_WARMUP_SECONDS)
                 
-                self.market_opened_at = time.time()
+                self.market_opened_at = time.monotonic()
                 self.market_open_event.set()
 
     async def maybe_cancel_top_counterparty(self, session):
@@ -480,22 +599,18 @@ class UltraFastMarketBot:
         if random.random() >= CANCEL_TOP_PROB:
             return
 
-        if not self.depth_data:
-            return
-
         if self.is_oneway_up():
             side = 'sell'
-            book_side = self.depth_data.get('asks', [])
+            top = self.top_ask
         elif self.is_oneway_down():
             side = 'buy'
-            book_side = self.depth_data.get('bids', [])
+            top = self.top_bid
         else:
             return
 
-        if not book_side:
+        if not top:
             return
 
-        top = book_side[0]
         order_ids = []
         if len(top) >= 3:
             third = top[2]
@@ -510,128 +625,222 @@ class UltraFastMarketBot:
             return
 
         async def _cancel_worker(session, side, order_ids):
-            deadline = time.time() + 1800  
-            ids = list(order_ids)
-            random.shuffle(ids)
-            tried = set()
-            for oid in ids:
-                if time.time() > deadline:
-                    logging.info(f"⏱️ 주문 취소 타임아웃: 중단 (tried={len(tried)})")
-                    return
-                if oid in tried:
-                    continue
-                tried.add(oid)
+            unique_ids = list(dict.fromkeys(order_ids))
+            for oid in random.sample(unique_ids, min(len(unique_ids), CANCEL_MAX_ATTEMPTS)):
                 try:
-                    status, result = await delete_order(session, side, oid)
+                    status, _ = await delete_order(session, side, oid)
                 except Exception as e:
-                    logging.error(f"주문 취소 에러: {e}")
+                    logging.error("주문 취소 에러: %s", e)
                     await asyncio.sleep(0.1)
                     continue
 
                 if status == 200:
-                    logging.info(f"❌ 카운터파티 주문 취소 성공: order_id={oid}, side={side}")
+                    logging.info("❌ 카운터파티 주문 취소 성공: order_id=%s, side=%s", oid, side)
                     return
-                elif status == 500:
-                    await asyncio.sleep(0.05)
-                    continue
-                else:
-                    await asyncio.sleep(0.05)
-                    continue
+                await asyncio.sleep(0.05)
 
         try:
             asyncio.create_task(_cancel_worker(session, side, order_ids))
         except Exception as e:
-            logging.error(f"취소 작업 스케줄 실패: {e}")
-
-async def decode_base64_gzip(data):
-    return json.loads(data)
-
+            logging.error("취소 작업 스케줄 실패: %s", e)
 
 async def delete_order(session, side, order_id):
-    url = f"{ORDER_API_BASE}/{SYMBOL}/{side}"
+    url = ORDER_URLS[side]
     body = {"order_id": order_id}
     try:
-        async with session.delete(url, json=body, headers=HEADERS) as resp:
+        async with session.delete(url, data=orjson.dumps(body), headers=JSON_HEADERS, timeout=ORDER_TIMEOUT) as resp:
             status = resp.status
             try:
-                result = await resp.json()
+                result = orjson.loads(await resp.read())
             except Exception:
                 result = None
             return status, result
     except Exception as e:
-        logging.error(f"주문 취소 에러: {e}")
+        logging.error("주문 취소 에러: %s", e)
         return None, {"error": str(e)}
 
 
-async def send_order(session, order):
-    url = f"{ORDER_API_BASE}/{SYMBOL}/{order['side']}"
-    body = {"type": order["type"], "quantity": int(order["quantity"])}
-    if order["type"] == "limit":
-        body["price"] = int(order["price"])
-    
-    if order.get("log") == "[WHALE]":
-        logging.info(f"🐋 [WHALE/{order['side'].upper()}/{order['type'].upper()}] {order.get('price', 'Market')}: 수량={order['quantity']}")
+def build_order_body(order):
+    body = {"type": order.type, "quantity": int(order.quantity)}
+    if order.type == "limit":
+        body["price"] = int(order.price)
+    return body
+
+
+def log_whale_order(order):
+    price = order.price if order.price is not None else "Market"
+    logging.info("🐋 [WHALE/%s/%s] %s: 수량=%s", order.side.upper(), order.type.upper(), price, order.quantity)
+
+
+def handle_order_result(bot, order, result):
+    order_info = result.get("order")
+    if order_info and isinstance(order_info, dict):
+        inner_order = order_info.get("order")
+        if inner_order and isinstance(inner_order, dict):
+            order_id = inner_order.get("order_id")
+            side = inner_order.get("side", order.side)
+            
+            if order_id and not order.persistent:
+                entry = (time.monotonic() + ORDER_DELETE_DELAY, side, order_id)
+                heapq.heappush(bot.order_delete_heap, entry)
+                if bot.order_delete_heap[0] is entry:
+                    bot.order_delete_event.set()
+
+
+async def send_order(bot, session, order):
+    url = ORDER_URLS[order.side]
+    body = build_order_body(order)
 
     try:
-        async with session.post(url, json=body, headers=HEADERS) as resp:
-            result = await resp.json()
-            order_info = result.get("order")
-            if order_info and isinstance(order_info, dict):
-                inner_order = order_info.get("order")
-                if inner_order and isinstance(inner_order, dict):
-                    order_id = inner_order.get("order_id")
-                    side = inner_order.get("side", order["side"])
-                    
-                    if order_id and not order.get("persistent", False):
-                        asyncio.create_task(schedule_order_delete(session, side, order_id))
+        async with session.post(url, data=orjson.dumps(body), headers=JSON_HEADERS, timeout=ORDER_TIMEOUT) as resp:
+            result = orjson.loads(await resp.read())
+            handle_order_result(bot, order, result)
             return result
     except Exception as e:
-        logging.error(f"주문 에러: {e}")
+        logging.error("주문 에러: %s", e)
         return None
 
 
-async def schedule_order_delete(session, side, order_id):
-    await asyncio.sleep(600)
-    await delete_order(session, side, order_id)
+async def send_orders_bulk(bot, session, side, orders):
+    url = BULK_ORDER_URLS[side]
+    body = [build_order_body(order) for order in orders]
+
+    try:
+        async with session.post(url, data=orjson.dumps(body), headers=JSON_HEADERS, timeout=ORDER_TIMEOUT) as resp:
+            status = resp.status
+            raw = await resp.read()
+    except aiohttp.ClientConnectorError as e:
+        logging.error("벌크 주문 연결 실패: %s - 개별 주문으로 재시도", e)
+        tasks = [send_order(bot, session, order) for order in orders]
+        return await asyncio.gather(*tasks, return_exceptions=True)
+    except Exception as e:
+        logging.error("벌크 주문 에러: %s", e)
+        return None
 
+    if status in (404, 405):
+        if bot.bulk_available:
+            logging.info("📦 벌크 주문 미지원: 개별 주문으로 전환")
+        bot.bulk_available = False
+        tasks = [send_order(bot, session, order) for order in orders]
+        return await asyncio.gather(*tasks, return_exceptions=True)
+
+    if status >= 400:
+        bot.bulk_failures += 1
+        logging.error("벌크 주문 실패 (%s): %s", status, raw.decode(errors="replace"))
+        if bot.bulk_failures >= BULK_MAX_FAILURES and bot.bulk_available:
+            logging.info("📦 벌크 주문 연속 %s회 실패: 개별 주문으로 전환", bot.bulk_failures)
+            bot.bulk_available = False
+        return None
+    bot.bulk_failures = 0
 
-async def sse_listener(bot):
-    connector = aiohttp.TCPConnector(limit=50)
-    async with aiohttp.ClientSession(connector=connector) as session:
-        while True:
+    try:
+        results = orjson.loads(raw)
+    except orjson.JSONDecodeError:
+        results = None
+    if isinstance(results, dict):
+        results = results.get("orders")
+    if not isinstance(results, list):
+        logging.error("벌크 주문 응답 해석 불가 (%s): %s", status, raw.decode(errors="replace"))
+        return None
+    for order, result in zip(orders, results):
+        if isinstance(result, dict):
+            handle_order_result(bot, order, result)
+    return results
+
+
+async def send_orders(bot, session, orders):
+    for order in orders:
+        if order.log == "[WHALE]":
+            log_whale_order(order)
+
+    if not bot.bulk_available:
+        tasks = [send_order(bot, session, order) for order in orders]
+        return await asyncio.gather(*tasks, return_exceptions=True)
+
+    by_side = defaultdict(list)
+    for order in orders:
+        by_side[order.side].append(order)
+    tasks = [send_orders_bulk(bot, session, side, side_orders) for side, side_orders in by_side.items()]
+    return await asyncio.gather(*tasks, return_exceptions=True)
+
+
+async def order_delete_worker(bot, session):
+    heap = bot.order_delete_heap
+    event = bot.order_delete_event
+    while True:
+        now = time.monotonic()
+        while heap and heap[0][0] <= now:
+            _, side, order_id = heapq.heappop(heap)
+            asyncio.create_task(delete_order(session, side, order_id))
+
+        event.clear()
+        timeout = heap[0][0] - now if heap else None
+        try:
+            await asyncio.wait_for(event.wait(), timeout=timeout)
+        except asyncio.TimeoutError:
+            pass
+
+
+async def sse_listener(bot, session):
+    dispatch = {
+        b"depth": bot.update_depth,
+        b"ledger": bot.update_ledger,
+        b"session": bot.update_session
+    }
+    while True:
+        try:
+            async with session.get(SSE_URL) as resp:
+                handler = None
+                buffer = bytearray()
+                async for chunk in resp.content.iter_chunked(8192):
+                    buffer += chunk
+                    start = 0
+                    end = buffer.find(b"\n", len(buffer) - len(chunk))
+                    while end != -1:
+                        line = buffer[start:end]
+                        first = line[:1]
+                        if first == b"d":
+                            if handler is not None and line.startswith(b"data:"):
+                                handler(orjson.loads(line[5:]))
+                        elif first == b"e":
+                            if line.startswith(b"event:"):
+                                handler = dispatch.get(bytes(line[6:].strip()))
+                        start = end + 1
+                        end = buffer.find(b"\n", start)
+                    if start:
+                        del buffer[:start]
+        except Exception as e:
+            print(f"SSE error: {e}")
+            await asyncio.sleep(2)
+
+
+async def trading_loop(bot, session):
+    last_seen_seq = -1
+    stale_ticks = 0
+    depth_waited_open = -1
+    while True:
+        await bot.market_open_event.wait()
+        if bot.market_opened_at != depth_waited_open and not bot.depth_ready.is_set():
+            depth_waited_open = bot.market_opened_at
             try:
-                async with session.get(SSE_URL, headers=HEADERS) as resp:
-                    async for line in resp.content:
-                        line = line.decode().strip()
-                        if line.startswith("event:"):
-                            event = line.split("event:", 1)[1].strip()
-                        elif line.startswith("data:"):
-                            data = line.split("data:", 1)[1].strip()
-                            if event == "depth":
-                                bot.update_depth(await decode_base64_gzip(data))
-                            elif event == "ledger":
-                                bot.update_ledger(await decode_base64_gzip(data))
-                            elif event == "session":
-                                bot.update_session(await decode_base64_gzip(data))
-            except Exception as e:
-                print(f"SSE error: {e}")
-                await asyncio.sleep(2)
-
-
-async def trading_loop(bot):
-    connector = aiohttp.TCPConnector(limit=50)
-    async with aiohttp.ClientSession(connector=connector) as session:
-        while True:
-            await bot.market_open_event.wait()
+                await asyncio.wait_for(bot.depth_ready.wait(), timeout=0.5)
+            except asyncio.TimeoutError:
+                pass
+
+        if bot.state_seq == last_seen_seq and stale_ticks < STALE_TICK_LIMIT and not bot.is_warmup_period():
+            stale_ticks += 1
+            await asyncio.sleep(bot.get_trading_interval())
+            continue
+        last_seen_seq = bot.state_seq
+        stale_ticks = 0
 
-            orders = bot.decide_orders()
-            if orders:
-                tasks = [send_order(session, order) for order in orders]
-                await asyncio.gather(*tasks, return_exceptions=True)
-                await bot.maybe_cancel_top_counterparty(session)
+        orders = bot.decide_orders()
+        if orders:
+            await send_orders(bot, session, orders)
+            await bot.maybe_cancel_top_counterparty(session)
 
-            interval = bot.get_trading_interval()
-            await asyncio.sleep(interval)
+        interval = bot.get_trading_interval()
+        await asyncio.sleep(interval)
 
 
 async def main():
@@ -640,14 +849,28 @@ async def main():
         ticksize=TICKSIZE,
         whale_ratio=WHALE_RATIO
     )
-    await asyncio.gather(
-        sse_listener(bot),
-        trading_loop(bot)
+    connector = aiohttp.TCPConnector(
+        limit=100,
+        limit_per_host=100,
+        use_dns_cache=True,
+        ttl_dns_cache=3600,
+        keepalive_timeout=60,
+        force_close=False
     )
+    async with aiohttp.ClientSession(connector=connector, headers=HEADERS) as session:
+        await asyncio.gather(
+            sse_listener(bot, session),
+            trading_loop(bot, session),
+            order_delete_worker(bot, session),
+            bot.price_flusher()
+        )
 
 
 if __name__ == "__main__":
     try:
-        asyncio.run(main())
+        if uvloop is not None:
+            uvloop.run(main())
+        else:
+            asyncio.run(main())
     except KeyboardInterrupt:
         print("Terminated")
\ No newline at end of file